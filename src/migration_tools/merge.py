@@ -1,12 +1,27 @@
 from __future__ import annotations
 
 import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable, List, Sequence
-
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Connection, Engine, Row
+from functools import lru_cache, partial
+from typing import Callable, Deque, Iterable, List, Mapping, NamedTuple, Sequence
+
+from sqlalchemy import (
+    TableClause,
+    TextClause,
+    bindparam,
+    column,
+    create_engine,
+    literal_column,
+    make_url,
+    table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.engine import Connection, Engine, RootTransaction, Row
+from sqlalchemy.pool import NullPool
 
 from .transform import (
     MergeSectionResult,
@@ -20,6 +35,99 @@ from .transform import (
 
 logger = logging.getLogger(__name__)
 
+# executemany 每页行数：psycopg2 驱动下一次往返写入的最大行数
+_EXECUTEMANY_PAGE_SIZE = 1000
+# 后台写入线程最多积压的批次数，限制内存占用
+_MAX_PENDING_BATCHES = 2
+
+# ---------------------------------------------------------------------------
+# statements
+# ---------------------------------------------------------------------------
+
+
+def _build_upsert(
+    target: TableClause, *, conflict_key: str, keep: Sequence[str] = ()
+) -> Insert:
+    """ON CONFLICT 覆盖更新，并通过 ``xmax = 0`` 返回每行是否为新插入。"""
+    stmt = insert(target)
+    return stmt.on_conflict_do_update(
+        index_elements=[conflict_key],
+        set_={
+            col.name: stmt.excluded[col.name]
+            for col in target.columns
+            if col.name != conflict_key and col.name not in keep
+        },
+    ).returning(literal_column("xmax = 0").label("inserted"))
+
+
+_USER_SELECT = text(
+    "SELECT id, username, hashed_password, created_at FROM users ORDER BY id"
+)
+
+_USER_IDS_IN = text("SELECT id FROM tbl_user WHERE id IN :keys").bindparams(
+    bindparam("keys", expanding=True)
+)
+
+_USER_COLUMNS = (
+    "id",
+    "username",
+    "password",
+    "phone",
+    "privileges",
+    "created_at",
+    "updated_at",
+)
+
+_UPSERT_USER_STMT = _build_upsert(
+    table("tbl_user", *(column(name) for name in _USER_COLUMNS)),
+    conflict_key="id",
+    keep=("created_at",),
+)
+
+_IMAGE_SELECT = text(
+    """
+    SELECT uuid, kind, label, file_name, uploaded_by, uploaded_at, category, trace_id
+    FROM images
+    ORDER BY uploaded_at, uuid
+    """
+)
+
+_IMAGE_COLUMNS = (
+    "uuid",
+    "user_id",
+    "aspect_id",
+    "name",
+    "description",
+    "visibility",
+    "labels",
+    "file_name",
+    "metadata_id",
+    "created_at",
+    "updated_at",
+)
+
+_COLUMN_TYPES_SELECT = text(
+    """
+    SELECT attname, format_type(atttypid, atttypmod)
+    FROM pg_attribute
+    WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 AND NOT attisdropped
+    """
+)
+
+_SET_SEQUENCE_STMT = text("SELECT setval(:sequence, :value, true)")
+
+_ASPECT_IDS_IN = text("SELECT id FROM tbl_image_aspect WHERE id IN :keys").bindparams(
+    bindparam("keys", expanding=True)
+)
+
+_INSERT_ASPECT_STMT = text(
+    """
+    INSERT INTO tbl_image_aspect (id, name, description, ratio_width_unit, ratio_height_unit)
+    VALUES (:id, :name, :description, :ratio_width_unit, :ratio_height_unit)
+    ON CONFLICT (id) DO NOTHING
+    """
+)
+
 
 @dataclass(slots=True)
 class MergeConfig:
@@ -42,7 +150,7 @@ class MergeResult:
 
 def run_merge(config: MergeConfig) -> MergeResult:
     """入口：建立连接并执行用户、图片的迁移。"""
-    source_engine = _create_engine(config.source_url, name="source")
+    source_engine = _create_engine(config.source_url, name="source", read_only=True)
     target_engine = _create_engine(config.target_url, name="target")
 
     try:
@@ -50,7 +158,7 @@ def run_merge(config: MergeConfig) -> MergeResult:
             source_engine.connect() as source_conn,
             target_engine.connect() as target_conn,
         ):
-            source_tx = source_conn.begin()
+            source_tx = _begin_read_snapshot(source_conn)
             target_tx = target_conn.begin()
             try:
                 logger.info("开始迁移 users 与 images 表数据")
@@ -58,6 +166,7 @@ def run_merge(config: MergeConfig) -> MergeResult:
                     source_conn=source_conn,
                     target_conn=target_conn,
                     batch_size=config.batch_size,
+                    dry_run=config.dry_run,
                 )
                 images_summary = merge_images(
                     source_conn=source_conn,
@@ -92,35 +201,37 @@ def run_merge(config: MergeConfig) -> MergeResult:
 
 
 def merge_users(
-    *, source_conn: Connection, target_conn: Connection, batch_size: int
+    *,
+    source_conn: Connection,
+    target_conn: Connection,
+    batch_size: int,
+    dry_run: bool = False,
 ) -> MergeSectionResult:
     summary = MergeSectionResult()
-    existing_ids = _collect_existing_ids(target_conn, "tbl_user")
 
-    stmt = text(
-        "SELECT id, username, hashed_password, created_at FROM users ORDER BY id"
-    )
-    rows = source_conn.execute(stmt)
-
-    payload: List[dict] = []
-    for row in rows:
-        summary.processed += 1
-        entry = _adapt_user_row(row)
-        if row.id in existing_ids:
-            summary.updated += 1
-        else:
-            summary.inserted += 1
-            existing_ids.add(row.id)
-        payload.append(entry)
-
-        if len(payload) >= batch_size:
-            _upsert_users(target_conn, payload)
-            payload.clear()
-
-    if payload:
-        _upsert_users(target_conn, payload)
-
-    _sync_sequence(target_conn, "tbl_user_id_seq", "tbl_user", "id")
+    rows = source_conn.execution_options(
+        stream_results=True, yield_per=batch_size
+    ).execute(_USER_SELECT)
+
+    cold_load = _is_cold_load(target_conn, "tbl_user")
+    flush = partial(_flush_users, cold_load=cold_load)
+    max_id: int | None = None
+    with _BatchFlusher(flush, target_conn) as flusher:
+        for batch in rows.partitions(batch_size):
+            flusher.submit(batch)
+            # 源数据按 id 升序读取，每批最后一行即目前见过的最大 id
+            max_id = batch[-1][0]
+
+    _merge_counts(summary, flusher.result)
+    if not dry_run:
+        # 冷启动时目标表原本为空，源库最大 id 即序列应设置的值，无需再查询
+        _sync_sequence(
+            target_conn,
+            "tbl_user_id_seq",
+            "tbl_user",
+            "id",
+            max_value=max_id if cold_load else None,
+        )
     logger.info(
         "用户迁移完成：共处理 %s 条，新增 %s 条，更新 %s 条，跳过 %s 条",
         summary.processed,
@@ -131,45 +242,67 @@ def merge_users(
     return summary
 
 
-def _adapt_user_row(row: Row) -> dict:
-    created_at = _ensure_datetime(row.created_at)
-    now = datetime.utcnow()
+def _flush_users(
+    conn: Connection,
+    rows: Sequence[Row],
+    summary: MergeSectionResult,
+    *,
+    cold_load: bool = False,
+) -> None:
+    now = _utcnow()
+    to_datetime = _datetime_converter((row[3] for row in rows), now)
+    payload = [
+        _adapt_user_row(id_, username, hashed_password, created_at, now, to_datetime)
+        for id_, username, hashed_password, created_at in rows
+    ]
+    summary.processed += len(payload)
+
+    if cold_load:
+        _copy_rows(conn, "tbl_user", _USER_COLUMNS, payload)
+        summary.inserted += len(payload)
+    else:
+        _upsert_rows(conn, _UPSERT_USER_STMT, payload, summary)
+
+
+def _adapt_user_row(
+    id_: int,
+    username: str,
+    hashed_password: str,
+    created_at: datetime | None,
+    now: datetime,
+    to_datetime: Callable[[datetime | None], datetime],
+) -> dict:
     return {
-        "id": row.id,
-        "username": row.username,
-        "password": row.hashed_password,
+        "id": id_,
+        "username": username,
+        "password": hashed_password,
         "phone": None,
         "privileges": normalize_privileges(),
-        "created_at": created_at,
+        "created_at": to_datetime(created_at),
         "updated_at": now,
     }
 
 
-def _upsert_users(conn: Connection, payload: Sequence[dict]) -> None:
-    if not payload:
-        return
-    conn.execute(
-        text(
-            """
-            INSERT INTO tbl_user (id, username, password, phone, privileges, created_at, updated_at)
-            VALUES (:id, :username, :password, :phone, :privileges, :created_at, :updated_at)
-            ON CONFLICT (id) DO UPDATE SET
-                username = EXCLUDED.username,
-                password = EXCLUDED.password,
-                phone = EXCLUDED.phone,
-                privileges = EXCLUDED.privileges,
-                updated_at = EXCLUDED.updated_at
-            """
-        ),
-        payload,
-    )
-
-
 # ---------------------------------------------------------------------------
 # images
 # ---------------------------------------------------------------------------
 
 
+class _PendingImage(NamedTuple):
+    """主循环筛选后排队等待写入的图片，由后台线程统一转换。"""
+
+    uuid: str
+    kind: str
+    label: str | None
+    file_name: str
+    uploaded_at: datetime | None
+    category: str | None
+    trace_id: str | None
+    aspect_id: str
+    user_id: int
+    visibility: int
+
+
 def merge_images(
     *,
     source_conn: Connection,
@@ -180,68 +313,85 @@ def merge_images(
     summary = MergeSectionResult()
     ensure_required_aspects(target_conn)
 
-    existing_uuids = _collect_existing_ids(target_conn, "tbl_image", column="uuid")
-    known_user_ids = _collect_existing_ids(target_conn, "tbl_user")
-
-    if admin_user_id is not None and admin_user_id not in known_user_ids:
+    if admin_user_id is not None and not _fetch_existing_keys(
+        target_conn, _USER_IDS_IN, {admin_user_id}
+    ):
         raise ValueError(f"admin-user-id {admin_user_id} 不存在于目标库的 tbl_user 中")
 
-    stmt = text(
-        """
-        SELECT uuid, kind, label, file_name, uploaded_by, uploaded_at, category, trace_id
-        FROM images
-        ORDER BY uploaded_at, uuid
-        """
-    )
-    rows = source_conn.execute(stmt)
+    rows = source_conn.execution_options(
+        stream_results=True, yield_per=batch_size
+    ).execute(_IMAGE_SELECT)
+
+    if _is_cold_load(target_conn, "tbl_image"):
+        flush = partial(_flush_images, upsert_stmt=None)
+    else:
+        column_types = _fetch_column_types(target_conn, "tbl_image")
+        flush = partial(_flush_images, upsert_stmt=_build_image_upsert(column_types))
+    # 热循环中只操作局部变量，结束后再一次性写回 summary
+    processed = skipped = 0
+    with _BatchFlusher(flush, target_conn) as flusher:
+        batch: List[_PendingImage] = []
+        append = batch.append
+        batch_count = 0
+        for (
+            uuid,
+            kind,
+            label,
+            file_name,
+            uploaded_by,
+            uploaded_at,
+            category,
+            trace_id,
+        ) in rows:
+            processed += 1
+
+            if uploaded_by is None:
+                if admin_user_id is None:
+                    skipped += 1
+                    logger.warning(
+                        "图片 %s 无上传用户且未提供 admin-user-id，已跳过", uuid
+                    )
+                    continue
+                user_id = admin_user_id
+                visibility = 1
+            else:
+                user_id = uploaded_by
+                visibility = 0
 
-    payload: List[dict] = []
-    for row in rows:
-        summary.processed += 1
+            try:
+                aspect_id = derive_aspect_id(kind)
+            except UnknownAspectError as exc:
+                skipped += 1
+                logger.warning("图片 %s 跳过：%s", uuid, exc)
+                continue
 
-        if row.uploaded_by is None:
-            if admin_user_id is None:
-                summary.skipped += 1
-                logger.warning(
-                    "图片 %s 无上传用户且未提供 admin-user-id，已跳过", row.uuid
+            append(
+                _PendingImage(
+                    uuid=uuid,
+                    kind=kind,
+                    label=label,
+                    file_name=file_name,
+                    uploaded_at=uploaded_at,
+                    category=category,
+                    trace_id=trace_id,
+                    aspect_id=aspect_id,
+                    user_id=user_id,
+                    visibility=visibility,
                 )
-                continue
-            user_id = admin_user_id
-            visibility = 1
-        else:
-            user_id = row.uploaded_by
-            visibility = 0
-
-        if user_id not in known_user_ids:
-            summary.skipped += 1
-            logger.warning(
-                "图片 %s 的用户 %s 不存在于目标库，已跳过", row.uuid, user_id
             )
-            continue
-
-        try:
-            aspect_id = derive_aspect_id(row.kind)
-        except UnknownAspectError as exc:
-            summary.skipped += 1
-            logger.warning("图片 %s 跳过：%s", row.uuid, exc)
-            continue
-
-        entry = _adapt_image_row(row, aspect_id, user_id, visibility)
-
-        if row.uuid in existing_uuids:
-            summary.updated += 1
-        else:
-            summary.inserted += 1
-            existing_uuids.add(row.uuid)
-
-        payload.append(entry)
-        if len(payload) >= batch_size:
-            _upsert_images(target_conn, payload)
-            payload.clear()
-
-    if payload:
-        _upsert_images(target_conn, payload)
-
+            batch_count += 1
+            if batch_count >= batch_size:
+                flusher.submit(batch)
+                batch = []
+                append = batch.append
+                batch_count = 0
+
+        if batch:
+            flusher.submit(batch)
+
+    summary.processed += processed
+    summary.skipped += skipped
+    _merge_counts(summary, flusher.result)
     logger.info(
         "图片迁移完成：共处理 %s 条，新增 %s 条，更新 %s 条，跳过 %s 条",
         summary.processed,
@@ -252,6 +402,44 @@ def merge_images(
     return summary
 
 
+def _flush_images(
+    conn: Connection,
+    images: Sequence[_PendingImage],
+    summary: MergeSectionResult,
+    *,
+    upsert_stmt: TextClause | None,
+) -> None:
+    # 整批在后台线程中转换，与源库读取重叠；upsert_stmt 为 None 表示冷加载
+    known_user_ids = _fetch_existing_keys(
+        conn, _USER_IDS_IN, {image.user_id for image in images}
+    )
+
+    now = _utcnow()
+    to_datetime = _datetime_converter((image.uploaded_at for image in images), now)
+    # COPY 直接写入列表；unnest 需要 labels 以数组字面量文本传入
+    labels = build_image_labels if upsert_stmt is None else _labels_literal
+    payload = [
+        _adapt_image_row(image, now, to_datetime, labels)
+        for image in images
+        if image.user_id in known_user_ids
+    ]
+    if len(payload) != len(images):
+        for image in images:
+            if image.user_id not in known_user_ids:
+                logger.warning(
+                    "图片 %s 的用户 %s 不存在于目标库，已跳过",
+                    image.uuid,
+                    image.user_id,
+                )
+        summary.skipped += len(images) - len(payload)
+
+    if upsert_stmt is None:
+        _copy_rows(conn, "tbl_image", _IMAGE_COLUMNS, payload)
+        summary.inserted += len(payload)
+    else:
+        _upsert_images(conn, upsert_stmt, payload, summary)
+
+
 def ensure_required_aspects(target_conn: Connection) -> None:
     required = {
         "card-background": {
@@ -270,132 +458,294 @@ def ensure_required_aspects(target_conn: Connection) -> None:
         },
     }
 
-    existing = {
-        row.id
-        for row in target_conn.execute(
-            text("SELECT id FROM tbl_image_aspect WHERE id IN (:bg, :pass)"),
-            {"bg": "card-background", "pass": "sega-passname"},
-        )
-    }
+    existing = _fetch_existing_keys(target_conn, _ASPECT_IDS_IN, required)
 
     missing = [data for key, data in required.items() if key not in existing]
     if not missing:
         return
 
-    target_conn.execute(
-        text(
-            """
-            INSERT INTO tbl_image_aspect (id, name, description, ratio_width_unit, ratio_height_unit)
-            VALUES (:id, :name, :description, :ratio_width_unit, :ratio_height_unit)
-            ON CONFLICT (id) DO NOTHING
-            """
-        ),
-        missing,
-    )
+    target_conn.execute(_INSERT_ASPECT_STMT, missing)
     logger.info(
         "已补充缺失的图片比例配置：%s", ", ".join(item["id"] for item in missing)
     )
 
 
-def _adapt_image_row(row: Row, aspect_id: str, user_id: int, visibility: int) -> dict:
-    uploaded_at = _ensure_datetime(row.uploaded_at)
-    labels = build_image_labels(row.kind, row.category)
-
+def _adapt_image_row(
+    image: _PendingImage,
+    now: datetime,
+    to_datetime: Callable[[datetime | None], datetime],
+    labels: Callable[[str, str | None], object] = build_image_labels,
+) -> dict:
+    uuid, kind, label, category = image.uuid, image.kind, image.label, image.category
     return {
-        "uuid": row.uuid,
-        "user_id": user_id,
-        "aspect_id": aspect_id,
-        "name": build_image_name(row.label, row.uuid, row.kind),
-        "description": build_image_description(row.label, row.category, row.kind),
-        "visibility": visibility,
-        "labels": labels,
-        "file_name": row.file_name,
-        "metadata_id": row.trace_id,
-        "created_at": uploaded_at,
-        "updated_at": datetime.utcnow(),
+        "uuid": uuid,
+        "user_id": image.user_id,
+        "aspect_id": image.aspect_id,
+        "name": build_image_name(label, uuid, kind),
+        "description": build_image_description(label, category, kind),
+        "visibility": image.visibility,
+        "labels": labels(kind, category),
+        "file_name": image.file_name,
+        "metadata_id": image.trace_id,
+        "created_at": to_datetime(image.uploaded_at),
+        "updated_at": now,
     }
 
 
-def _upsert_images(conn: Connection, payload: Sequence[dict]) -> None:
-    if not payload:
-        return
-    conn.execute(
-        text(
-            """
-            INSERT INTO tbl_image (
-                uuid,
-                user_id,
-                aspect_id,
-                name,
-                description,
-                visibility,
-                labels,
-                file_name,
-                metadata_id,
-                created_at,
-                updated_at
-            )
-            VALUES (
-                :uuid,
-                :user_id,
-                :aspect_id,
-                :name,
-                :description,
-                :visibility,
-                :labels,
-                :file_name,
-                :metadata_id,
-                :created_at,
-                :updated_at
-            )
-            ON CONFLICT (uuid) DO UPDATE SET
-                user_id = EXCLUDED.user_id,
-                aspect_id = EXCLUDED.aspect_id,
-                name = EXCLUDED.name,
-                description = EXCLUDED.description,
-                visibility = EXCLUDED.visibility,
-                labels = EXCLUDED.labels,
-                file_name = EXCLUDED.file_name,
-                metadata_id = EXCLUDED.metadata_id,
-                updated_at = EXCLUDED.updated_at
-            """
-        ),
-        payload,
-    )
-
-
 # ---------------------------------------------------------------------------
 # helpers
 # ---------------------------------------------------------------------------
 
 
-def _create_engine(url: str, *, name: str) -> Engine:
-    engine = create_engine(url, pool_pre_ping=True, future=True)
+class _BatchFlusher:
+    """在单独的线程中依次写入批次，使源库读取与目标库写入相互重叠。
+
+    目标库连接只会被后台线程使用；退出上下文时等待所有批次完成，
+    写入失败的异常会在下一次 ``submit`` 或退出时抛出。任一批次失败后，
+    尚未开始的批次不再写入目标库，以免在回滚前继续产生写入。
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Connection, Sequence, MergeSectionResult], None],
+        conn: Connection,
+        max_pending: int = _MAX_PENDING_BATCHES,
+    ) -> None:
+        self.result = MergeSectionResult()
+        self._flush = flush
+        self._conn = conn
+        self._max_pending = max_pending
+        self._pending: Deque[Future] = deque()
+        self._failed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="migration-flush"
+        )
+
+    def __enter__(self) -> _BatchFlusher:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                while self._pending:
+                    self._pending.popleft().result()
+        finally:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+
+    def submit(self, batch: Sequence) -> None:
+        while self._pending and (
+            self._pending[0].done() or len(self._pending) >= self._max_pending
+        ):
+            self._pending.popleft().result()
+        self._pending.append(self._executor.submit(self._run, batch))
+
+    def _run(self, batch: Sequence) -> None:
+        # 已取消失败的 Future 无法阻止后台线程取走下一个批次，这里再兜底一次
+        if self._failed:
+            return
+        try:
+            self._flush(self._conn, batch, self.result)
+        except BaseException:
+            self._failed = True
+            raise
+
+
+def _merge_counts(summary: MergeSectionResult, other: MergeSectionResult) -> None:
+    summary.processed += other.processed
+    summary.inserted += other.inserted
+    summary.updated += other.updated
+    summary.skipped += other.skipped
+
+
+def _create_engine(url: str, *, name: str, read_only: bool = False) -> Engine:
+    # 每个引擎在整个迁移过程中只持有一个长连接，无需连接池与 pre-ping
+    options = _executemany_options(url)
+    if read_only:
+        # 源库的所有读取在同一个 REPEATABLE READ 事务内完成，见 _begin_read_snapshot
+        options["isolation_level"] = "REPEATABLE READ"
+    engine = create_engine(url, poolclass=NullPool, future=True, **options)
     logger.debug("已创建 %s 数据库引擎: %s", name, url)
     return engine
 
 
-def _collect_existing_ids(conn: Connection, table: str, column: str = "id") -> set:
-    result = conn.execute(text(f"SELECT {column} FROM {table}"))
+def _begin_read_snapshot(conn: Connection) -> RootTransaction:
+    """开启源库事务，使 users 与 images 两轮读取共享同一个一致性快照。"""
+    transaction = conn.begin()
+    if conn.dialect.name in ("mysql", "mariadb"):
+        conn.exec_driver_sql("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+    return transaction
+
+
+def _executemany_options(url: str) -> dict:
+    """为 psycopg2 开启 execute_batch，使 text() 语句的 executemany 分页发送。
+
+    Insert 构造的 upsert 走 SQLAlchemy 默认的 insertmanyvalues 分页
+    （每页 1000 行），psycopg 3 无需额外设置。
+    """
+    if make_url(url).get_driver_name() == "psycopg2":
+        return {
+            "executemany_mode": "values_plus_batch",
+            "executemany_batch_page_size": _EXECUTEMANY_PAGE_SIZE,
+        }
+    return {}
+
+
+def _fetch_existing_keys(conn: Connection, stmt: TextClause, keys: Iterable) -> set:
+    """只探测本批次涉及的主键，避免全表扫描目标库。"""
+    keys = list(keys)
+    if not keys:
+        return set()
+    result = conn.execute(stmt, {"keys": keys})
     return {row[0] for row in result}
 
 
-def _sync_sequence(conn: Connection, sequence: str, table: str, column: str) -> None:
-    conn.execute(
-        text(
-            "SELECT setval(:sequence, COALESCE((SELECT MAX("
-            + column
-            + ") FROM "
-            + table
-            + "), 0), true)"
-        ),
-        {"sequence": sequence},
+def _upsert_rows(
+    conn: Connection,
+    stmt: Insert,
+    payload: Sequence[dict],
+    summary: MergeSectionResult,
+) -> None:
+    if not payload:
+        return
+    _count_upserts(conn.execute(stmt, payload), summary)
+
+
+def _upsert_images(
+    conn: Connection,
+    stmt: TextClause,
+    payload: Sequence[dict],
+    summary: MergeSectionResult,
+) -> None:
+    if not payload:
+        return
+    # 行式 payload 转为按列的数组参数，供 unnest 展开
+    params = {name: [entry[name] for entry in payload] for name in _IMAGE_COLUMNS}
+    _count_upserts(conn.execute(stmt, params), summary)
+
+
+def _fetch_column_types(conn: Connection, table: str) -> dict[str, str]:
+    return dict(conn.execute(_COLUMN_TYPES_SELECT, {"table": table}).tuples())
+
+
+def _build_image_upsert(column_types: Mapping[str, str]) -> TextClause:
+    """按目标表的实际列类型构造基于 unnest 的 tbl_image upsert。
+
+    每列只绑定一个数组参数，语句参数个数与批量大小无关，不受 65535 个参数
+    上限约束。unnest 会把二维数组展平，因此 labels 以数组字面量组成的
+    ``text[]`` 传入，再逐行转换为该列的类型。
+    """
+    array_types = {name: f"{column_types[name]}[]" for name in _IMAGE_COLUMNS}
+    array_types["labels"] = "text[]"
+    selected = {name: f"t.{name}" for name in _IMAGE_COLUMNS}
+    selected["labels"] = f"CAST(t.labels AS {column_types['labels']})"
+
+    separator = ",\n        "
+    columns = ", ".join(_IMAGE_COLUMNS)
+    arrays = separator.join(
+        f"CAST(:{name} AS {array_types[name]})" for name in _IMAGE_COLUMNS
+    )
+    updates = separator.join(
+        f"{name} = EXCLUDED.{name}"
+        for name in _IMAGE_COLUMNS
+        if name not in ("uuid", "created_at")
+    )
+    return text(
+        f"""
+    INSERT INTO tbl_image ({columns})
+    SELECT
+        {separator.join(selected.values())}
+    FROM unnest(
+        {arrays}
+    ) AS t ({columns})
+    ON CONFLICT (uuid) DO UPDATE SET
+        {updates}
+    RETURNING xmax = 0 AS inserted
+    """
     )
 
 
-def _ensure_datetime(value: datetime | None) -> datetime:
+def _count_upserts(result: Iterable, summary: MergeSectionResult) -> None:
+    for (inserted,) in result:
+        summary.inserted += inserted
+        summary.updated += not inserted
+
+
+def _is_cold_load(conn: Connection, table: str) -> bool:
+    """目标表为空且驱动为 psycopg 3 时，改用 COPY 批量导入。"""
+    if conn.dialect.driver != "psycopg":
+        return False
+    is_empty = conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is None
+    if is_empty:
+        logger.info("目标表 %s 为空，使用 COPY 批量导入", table)
+    return is_empty
+
+
+def _copy_rows(
+    conn: Connection, table: str, columns: Sequence[str], payload: Sequence[dict]
+) -> None:
+    if not payload:
+        return
+    cursor = conn.connection.cursor()
+    try:
+        with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for entry in payload:
+                copy.write_row([entry[column] for column in columns])
+    finally:
+        cursor.close()
+
+
+def _sync_sequence(
+    conn: Connection,
+    sequence: str,
+    table: str,
+    column: str,
+    *,
+    max_value: int | None = None,
+) -> None:
+    if max_value is None:
+        # ORDER BY ... DESC LIMIT 1 可稳定走主键索引，避免 MAX() 退化为全表扫描
+        max_value = conn.execute(
+            text(f"SELECT {column} FROM {table} ORDER BY {column} DESC LIMIT 1")
+        ).scalar()
+    conn.execute(_SET_SEQUENCE_STMT, {"sequence": sequence, "value": max_value or 0})
+
+
+# labels 只由 (kind, category) 决定，按组合缓存其数组字面量
+@lru_cache(maxsize=1024)
+def _labels_literal(kind: str, category: str | None) -> str:
+    return _pg_array_literal(build_image_labels(kind, category))
+
+
+def _pg_array_literal(values: Iterable[str]) -> str:
+    quoted = (
+        '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values
+    )
+    return "{" + ",".join(quoted) + "}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _datetime_converter(
+    samples: Iterable[datetime | None], now: datetime
+) -> Callable[[datetime | None], datetime]:
+    """按批次内首个非空时间选择转换函数。
+
+    pymysql 读出的 DATETIME 均为无时区的 naive 值，此时只需补齐空值，
+    跳过逐行的时区判断。
+    """
+    sample = next((value for value in samples if value is not None), None)
+    if sample is not None and sample.tzinfo is None:
+        return lambda value: now if value is None else value
+    return lambda value: _ensure_datetime(value, now)
+
+
+def _ensure_datetime(value: datetime | None, now: datetime) -> datetime:
     if value is None:
-        return datetime.utcnow()
+        return now
     if value.tzinfo:
         return value.astimezone(timezone.utc).replace(tzinfo=None)
     return value
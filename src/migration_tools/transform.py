@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List, Optional
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 
 _KIND_TO_ASPECT = {
     "BACKGROUND": "card-background",
@@ -12,6 +13,13 @@ _KIND_TO_ASPECT = {
     "PASSNAME": "sega-passname",
 }
 
+# 预先展开常见的大小写写法，命中时只需一次字典查找
+_KIND_TO_ASPECT_ANY_CASE = (
+    _KIND_TO_ASPECT
+    | {kind.lower(): aspect for kind, aspect in _KIND_TO_ASPECT.items()}
+    | {kind.title(): aspect for kind, aspect in _KIND_TO_ASPECT.items()}
+)
+
 
 class UnknownAspectError(ValueError):
     """Raised when a legacy kind cannot be mapped to a known aspect."""
@@ -19,22 +27,27 @@ class UnknownAspectError(ValueError):
 
 def derive_aspect_id(kind: str) -> str:
     """Map the legacy `kind` enum to the correct aspect identifier."""
-    key = (kind or "").upper()
-    if key not in _KIND_TO_ASPECT:
-        raise UnknownAspectError(f"未识别的图片类型: {kind!r}")
-    return _KIND_TO_ASPECT[key]
+    try:
+        return _KIND_TO_ASPECT_ANY_CASE[kind]
+    except KeyError:
+        key = (kind or "").upper()
+        if key not in _KIND_TO_ASPECT:
+            raise UnknownAspectError(f"未识别的图片类型: {kind!r}") from None
+        return _KIND_TO_ASPECT[key]
 
 
 def build_image_labels(kind: str, category: Optional[str]) -> List[str]:
     """Compose the labels array to be written into `tbl_image.labels`."""
-    labels: List[str] = []
-    if kind:
-        labels.append(kind.lower())
-    if category:
-        normalized = category.strip()
-        if normalized:
-            labels.append(normalized.lower())
-    return labels or ["unclassified"]
+    return list(_image_labels(kind, category))
+
+
+# (kind, category) 组合很少而图片很多，按组合缓存计算结果
+@lru_cache(maxsize=1024)
+def _image_labels(kind: str, category: Optional[str]) -> Tuple[str, ...]:
+    kind_label = kind.lower() if kind else ""
+    category_label = category.strip().lower() if category else ""
+    labels = tuple(label for label in (kind_label, category_label) if label)
+    return labels or ("unclassified",)
 
 
 def build_image_name(label: Optional[str], uuid: str, kind: str) -> str:
@@ -49,7 +62,15 @@ def build_image_description(
     label: Optional[str], category: Optional[str], kind: str
 ) -> str:
     """Generate the `description` field for a migrated image."""
-    for candidate in (label, category, kind.title() if kind else None):
+    if label and label.strip():
+        return label.strip()
+    return _fallback_description(category, kind)
+
+
+# label 基本每张图片都不同，只缓存 label 为空时按 (category, kind) 决定的结果
+@lru_cache(maxsize=1024)
+def _fallback_description(category: Optional[str], kind: str) -> str:
+    for candidate in (category, kind.title() if kind else None):
         if candidate and candidate.strip():
             return candidate.strip()
     return "Legacy image imported via migration-tools"
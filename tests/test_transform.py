@@ -17,6 +17,8 @@ from migration_tools.transform import (
     [
         ("BACKGROUND", "card-background"),
         ("frame", "card-background"),
+        ("Mask", "card-background"),
+        ("cHaRaCtEr", "card-background"),
         ("PASSNAME", "sega-passname"),
     ],
 )
@@ -27,6 +29,8 @@ def test_derive_aspect_id(kind: str, expected: str) -> None:
 def test_derive_aspect_id_unknown() -> None:
     with pytest.raises(UnknownAspectError):
         derive_aspect_id("unknown")
+    with pytest.raises(UnknownAspectError):
+        derive_aspect_id(None)  # type: ignore[arg-type]
 
 
 @pytest.mark.parametrize(